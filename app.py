@@ -1,12 +1,31 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import uuid
 import folium
+from folium.plugins import FastMarkerCluster
+import pydeck as pdk
+import streamlit.components.v1 as components
 from streamlit_folium import folium_static
-from database import db, TrackingSession, LocationUpdate
+from sqlalchemy import select, update
+from database import db, TrackingSession, LocationUpdate, SessionSummary, SessionMeta
 from sms_service import sms_service
-import time
-import os
+import geo
+
+# Cap on individual points sent to the browser for the marker cluster
+MAX_MAP_MARKERS = 200
+# Cap on vertices in the trail polyline after simplification
+MAX_MAP_PATH_POINTS = 500
+# Trails reaching further than this from the latest location are zoomed to fit
+MAP_FIT_RADIUS_M = 1000
+# Sessions with more locations than this are drawn with deck.gl instead of Leaflet
+DECK_MAP_MIN_POINTS = 2000
+# Beyond this many locations the deck shows a heatmap of grid cells instead of every point
+HEATMAP_MIN_POINTS = 10000
+HEATMAP_CELL_M = 100
 
 # Page configuration
 st.set_page_config(
@@ -20,159 +39,263 @@ if 'current_tracking_id' not in st.session_state:
     st.session_state.current_tracking_id = None
 if 'tracking_sessions' not in st.session_state:
     st.session_state.tracking_sessions = []
+if 'sessions_version' not in st.session_state:
+    st.session_state.sessions_version = 0
+if 'sms_futures' not in st.session_state:
+    st.session_state.sms_futures = {}
+if 'share_locations' not in st.session_state:
+    st.session_state.share_locations = {}
 if 'lat' not in st.session_state:
     st.session_state.lat = 28.6139
 if 'lng' not in st.session_state:
     st.session_state.lng = 77.2090
+if 'latitude_input' not in st.session_state:
+    st.session_state.latitude_input = st.session_state.lat
+if 'longitude_input' not in st.session_state:
+    st.session_state.longitude_input = st.session_state.lng
 
 def debug_database():
     """Debug function to check database status"""
-    session = db.get_session()
-    try:
-        session_count = session.query(TrackingSession).count()
-        location_count = session.query(LocationUpdate).count()
-        
-        st.sidebar.markdown("---")
-        st.sidebar.subheader("🔧 Debug Info")
-        st.sidebar.write(f"Tracking Sessions: {session_count}")
-        st.sidebar.write(f"Location Updates: {location_count}")
-        
-        # Show recent sessions
-        recent_sessions = session.query(TrackingSession).order_by(TrackingSession.created_at.desc()).limit(5).all()
-        if recent_sessions:
-            st.sidebar.write("Recent Sessions:")
-            for s in recent_sessions:
-                locations_count = len(s.locations)
-                st.sidebar.write(f"- {s.id[:8]}... ({s.status}) - {locations_count} locs")
-                
-    except Exception as e:
-        st.sidebar.error(f"Debug error: {e}")
-    finally:
-        session.close()
+    with db.session_scope() as session:
+        try:
+            session_count = session.query(TrackingSession).count()
+            location_count = session.query(LocationUpdate).count()
+            
+            st.sidebar.markdown("---")
+            st.sidebar.subheader("🔧 Debug Info")
+            st.sidebar.write(f"Tracking Sessions: {session_count}")
+            st.sidebar.write(f"Location Updates: {location_count}")
+            
+            # Show recent sessions
+            recent_sessions = session.query(TrackingSession).order_by(TrackingSession.created_at.desc()).limit(5).all()
+            if recent_sessions:
+                st.sidebar.write("Recent Sessions:")
+                for s in recent_sessions:
+                    locations_count = len(s.locations)
+                    st.sidebar.write(f"- {s.id[:8]}... ({s.status}) - {locations_count} locs")
+                    
+        except Exception as e:
+            st.sidebar.error(f"Debug error: {e}")
 
-def init_session_state():
-    """Initialize session state with database data"""
-    session = db.get_session()
-    try:
-        tracking_sessions = session.query(TrackingSession).order_by(TrackingSession.created_at.desc()).all()
-        st.session_state.tracking_sessions = tracking_sessions
-    except Exception as e:
-        st.error(f"Error loading sessions: {e}")
-    finally:
-        session.close()
+@st.cache_data(ttl=30)
+def _load_sessions(version):
+    """Load tracking session summaries; `version` is bumped on every write"""
+    with db.session_scope() as session:
+        try:
+            # Plain column rows skip ORM instance hydration and the identity map
+            rows = session.execute(
+                select(
+                    TrackingSession.id,
+                    TrackingSession.recipient_phone,
+                    TrackingSession.created_at,
+                    TrackingSession.status
+                ).order_by(TrackingSession.created_at.desc())
+            ).all()
+            return [SessionSummary(*row) for row in rows]
+        except Exception as e:
+            st.error(f"Error loading sessions: {e}")
+            return []
+
+def _session_options(sessions):
+    """Selectbox labels for a session list"""
+    return dict(
+        (f"{s.id[:8]}... - {s.recipient_phone} - {s.created_at.strftime('%Y-%m-%d %H:%M')}", s.id)
+        for s in sessions
+    )
+
+@st.cache_resource
+def _sessions_version_counter():
+    """Process-wide source of session list versions, so cache keys never collide across users"""
+    return itertools.count(1)
+
+@st.cache_resource
+def _sms_pool():
+    """Shared worker pool for outgoing SMS, kept alive across reruns"""
+    return ThreadPoolExecutor(max_workers=8)
 
 def send_tracking_request(sender_phone, recipient_phone, custom_message):
     """Send tracking request via SMS"""
-    session = db.get_session()
-    try:
-        # Create tracking session
-        tracking_session = TrackingSession(
+    return send_tracking_requests(sender_phone, [recipient_phone], custom_message)[0]
+
+def send_tracking_requests(sender_phone, recipient_phones, custom_message):
+    """Create a tracking session per recipient in one commit, then send their SMS concurrently"""
+    # Create tracking sessions
+    tracking_sessions = [
+        TrackingSession(
             sender_phone=sender_phone,
             recipient_phone=recipient_phone,
             message=custom_message,
             expires_at=datetime.now(timezone.utc) + timedelta(hours=24)
         )
-        session.add(tracking_session)
-        session.commit()
-        session.refresh(tracking_session)
-        
-        # Send SMS
-        sms_result = sms_service.send_tracking_request(
-            recipient_phone, 
-            tracking_session.id, 
+        for recipient_phone in recipient_phones
+    ]
+    try:
+        with db.session_scope() as session:
+            session.add_all(tracking_sessions)
+    except Exception as e:
+        return [{'success': False, 'error': str(e)} for _ in recipient_phones]
+    
+    results = [_send_sms(tracking_session, custom_message) for tracking_session in tracking_sessions]
+    
+    st.session_state.current_tracking_id = tracking_sessions[-1].id
+    # Invalidate the cached session list; the next run reloads it once
+    st.session_state.sessions_version = next(_sessions_version_counter())
+    return results
+
+def _send_sms(tracking_session, custom_message):
+    """Send one tracking SMS, handing Twilio calls to the SMS pool so they run concurrently"""
+    if sms_service.twilio_configured:
+        st.session_state.sms_futures[tracking_session.id] = _sms_pool().submit(
+            sms_service.send_tracking_request,
+            tracking_session.recipient_phone,
+            tracking_session.id,
             custom_message
         )
-        
-        # Always return tracking session, but indicate SMS status
-        result = {
+        sms_result = {
             'success': True,
-            'tracking_id': tracking_session.id,
-            'tracking_url': sms_result.get('tracking_url', ''),
-            'sms_sent': sms_result.get('success', False),
-            'sms_message': sms_result.get('message', 'Unknown status'),
-            'debug_info': {
-                'formatted_phone': sms_result.get('formatted_phone'),
-                'error': sms_result.get('error')
-            }
+            'sms_sent': 'pending',
+            'tracking_url': f"{sms_service.server_url}/?tracking_id={tracking_session.id}",
+            'message': 'SMS queued'
         }
-        
-        if not sms_result['success']:
-            result['sms_error'] = sms_result.get('error', 'Unknown error')
-            result['help_url'] = sms_result.get('help_url')
-            
-        st.session_state.current_tracking_id = tracking_session.id
-        init_session_state()
-        return result
-            
-    except Exception as e:
-        session.rollback()
-        return {'success': False, 'error': str(e)}
-    finally:
-        session.close()
+    else:
+        # Demo mode makes no network call, so there's nothing to offload
+        sms_result = sms_service.send_tracking_request(
+            tracking_session.recipient_phone,
+            tracking_session.id,
+            custom_message
+        )
+    
+    # Always return tracking session, but indicate SMS status
+    result = {
+        'success': True,
+        'tracking_id': tracking_session.id,
+        'tracking_url': sms_result.get('tracking_url', ''),
+        'sms_sent': sms_result.get('sms_sent', sms_result.get('success', False)),
+        'sms_message': sms_result.get('message', 'Unknown status'),
+        'debug_info': {
+            'formatted_phone': sms_result.get('formatted_phone'),
+            'error': sms_result.get('error')
+        }
+    }
+    
+    if not sms_result['success']:
+        result['sms_error'] = sms_result.get('error', 'Unknown error')
+        result['help_url'] = sms_result.get('help_url')
+    
+    return result
+
+@st.cache_data(ttl=60)
+def _load_session_meta(tracking_id):
+    """Session fields for validation and display; cleared whenever a session's status changes"""
+    with db.session_scope() as session:
+        try:
+            row = session.execute(
+                select(
+                    TrackingSession.id,
+                    TrackingSession.recipient_phone,
+                    TrackingSession.message,
+                    TrackingSession.status,
+                    TrackingSession.expires_at
+                ).where(TrackingSession.id == tracking_id)
+            ).first()
+            if not row:
+                return None
+            # SQLite hands back naive datetimes; they are stored in UTC
+            expires_at = row.expires_at
+            if expires_at and expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            return SessionMeta(row.id, row.recipient_phone, row.message, row.status, expires_at)
+        except Exception as e:
+            st.error(f"Error getting session: {e}")
+            return None
 
 def get_tracking_session(tracking_id):
     """Get tracking session by ID"""
     if not tracking_id:
         return None
-        
-    session = db.get_session()
+    # Ids are stored as UUID bytes, so anything that isn't a UUID can't match
     try:
-        return session.query(TrackingSession).filter(TrackingSession.id == tracking_id).first()
-    except Exception as e:
-        st.error(f"Error getting session: {e}")
+        uuid.UUID(tracking_id)
+    except ValueError:
         return None
-    finally:
-        session.close()
+    return _load_session_meta(tracking_id)
+
+def get_session_with_locations(tracking_id):
+    """Get cached tracking session metadata by ID, then query its locations"""
+    tracking_session = get_tracking_session(tracking_id)
+    if not tracking_session:
+        return None, []
+    return tracking_session, get_locations(tracking_id)
 
 def get_locations(tracking_id):
     """Get all locations for a tracking session"""
     if not tracking_id:
         return []
         
-    session = db.get_session()
-    try:
-        locations = session.query(LocationUpdate).filter(
-            LocationUpdate.session_id == tracking_id
-        ).order_by(LocationUpdate.timestamp.asc()).all()
-        return locations
-    except Exception as e:
-        st.error(f"Error getting locations: {e}")
-        return []
-    finally:
-        session.close()
+    with db.session_scope() as session:
+        try:
+            # Plain column rows; skips building a LocationUpdate per point
+            return session.execute(
+                select(LocationUpdate.latitude, LocationUpdate.longitude,
+                       LocationUpdate.accuracy, LocationUpdate.timestamp)
+                .where(LocationUpdate.session_id == tracking_id)
+                .order_by(LocationUpdate.timestamp.asc())
+            ).all()
+        except Exception as e:
+            st.error(f"Error getting locations: {e}")
+            return []
 
 def save_location(tracking_id, latitude, longitude, accuracy=None):
     """Save location update"""
-    session = db.get_session()
+    return save_locations(tracking_id, [
+        {'latitude': latitude, 'longitude': longitude, 'accuracy': accuracy}
+    ])
+
+def save_locations(tracking_id, points):
+    """Save a batch of location updates in a single transaction"""
+    if not get_tracking_session(tracking_id):
+        return {'success': False, 'error': 'Invalid tracking session'}
+    
     try:
-        tracking_session = session.query(TrackingSession).filter(TrackingSession.id == tracking_id).first()
-        if not tracking_session:
-            return {'success': False, 'error': 'Invalid tracking session'}
-        
-        # Update session status
-        if tracking_session.status == 'pending':
-            tracking_session.status = 'active'
-        
-        # Save location
-        location_update = LocationUpdate(
-            session_id=tracking_id,
-            latitude=latitude,
-            longitude=longitude,
-            accuracy=accuracy
-        )
-        session.add(location_update)
-        session.commit()
-        
-        # Refresh the session state
-        init_session_state()
-        
-        return {'success': True}
-        
+        with db.session_scope() as session:
+            # Update session status in place, without loading the session row
+            activated = session.execute(
+                update(TrackingSession)
+                .where(TrackingSession.id == tracking_id, TrackingSession.status == 'pending')
+                .values(status='active')
+            ).rowcount
+            
+            # Save locations as one executemany INSERT
+            session.bulk_insert_mappings(LocationUpdate, [
+                {
+                    'session_id': tracking_id,
+                    'latitude': point['latitude'],
+                    'longitude': point['longitude'],
+                    'accuracy': point.get('accuracy')
+                }
+                for point in points
+            ])
     except Exception as e:
-        session.rollback()
         return {'success': False, 'error': str(e)}
-    finally:
-        session.close()
+    
+    # Invalidate the cached session list, and the session's metadata if it went active
+    st.session_state.sessions_version = next(_sessions_version_counter())
+    if activated:
+        _load_session_meta.clear()
+    
+    return {'success': True}
+
+def _decimate(points, eps_meters=25.0, max_points=MAX_MAP_PATH_POINTS):
+    """Simplify a trail of (lat, lng) points, dropping those within eps_meters of the line"""
+    lats, lngs = zip(*points)
+    kept = [points[i] for i in geo.simplify(lats, lngs, eps_meters)]
+    
+    # Noisy trails can come through RDP nearly intact, so stride them down as well,
+    # always keeping the latest point
+    if len(kept) > max_points:
+        stride = -(-(len(kept) - 1) // (max_points - 1))
+        kept = kept[:-1:stride] + [kept[-1]]
+    return kept
 
 def create_map(locations):
     """Create Folium map with location markers"""
@@ -185,22 +308,89 @@ def create_map(locations):
     latest_loc = locations[-1]
     m = folium.Map(location=[latest_loc.latitude, latest_loc.longitude], zoom_start=15)
     
-    # Add markers for all locations
-    for i, loc in enumerate(locations):
-        folium.Marker(
-            [loc.latitude, loc.longitude],
-            popup=f"Location {i+1}<br>Time: {loc.timestamp.strftime('%H:%M:%S')}",
-            tooltip=f"Location {i+1}",
-            icon=folium.Icon(color='red' if i == len(locations)-1 else 'blue')
-        ).add_to(m)
+    n = len(locations)
+    lats = np.fromiter((loc.latitude for loc in locations), dtype=np.float64, count=n)
+    lngs = np.fromiter((loc.longitude for loc in locations), dtype=np.float64, count=n)
+    points = tuple(zip(lats.tolist(), lngs.tolist()))
+    
+    # Zoom out to the whole trail when it runs beyond the street-level view
+    if geo.haversine(lats[-1], lngs[-1], lats, lngs).max() > MAP_FIT_RADIUS_M:
+        m.fit_bounds([[lats.min(), lngs.min()], [lats.max(), lngs.max()]])
+    
+    # Ship earlier locations as one coordinate array and cluster them client-side,
+    # striding long trails down to at most MAX_MAP_MARKERS points
+    if len(points) > 1:
+        stride = -(-(len(points) - 1) // MAX_MAP_MARKERS)
+        FastMarkerCluster(points[:-1:stride]).add_to(m)
+    
+    # Highlight the latest location with its own marker
+    folium.Marker(
+        [latest_loc.latitude, latest_loc.longitude],
+        popup=f"Location {len(locations)}<br>Time: {latest_loc.timestamp.strftime('%H:%M:%S')}",
+        tooltip=f"Location {len(locations)}",
+        icon=folium.Icon(color='red')
+    ).add_to(m)
     
     # Add line connecting locations
-    if len(locations) > 1:
-        locations_list = [[loc.latitude, loc.longitude] for loc in locations]
-        folium.PolyLine(locations_list, color="blue", weight=2.5, opacity=1).add_to(m)
+    if len(points) > 1:
+        folium.PolyLine(_decimate(points), color="blue", weight=2.5, opacity=1).add_to(m)
     
     return m
 
+def create_deck(locations):
+    """Create a WebGL map drawing every location, for trails too long for Leaflet"""
+    n = len(locations)
+    df = pd.DataFrame({
+        'lat': np.fromiter((loc.latitude for loc in locations), dtype=np.float64, count=n),
+        'lon': np.fromiter((loc.longitude for loc in locations), dtype=np.float64, count=n),
+    })
+    latest = df.iloc[[-1]]
+    
+    if n > HEATMAP_MIN_POINTS:
+        # Aggregate server-side so the payload grows with the area covered, not the point count
+        cell_lats, cell_lngs, counts = geo.grid_counts(df['lat'], df['lon'], HEATMAP_CELL_M)
+        cells = pd.DataFrame({'lat': cell_lats, 'lon': cell_lngs, 'count': counts})
+        # Stride the trail too; it is context here, at most as many vertices as a point map
+        stride = -(-(n - 1) // DECK_MAP_MIN_POINTS)
+        path = pd.concat([df.iloc[:-1:stride], latest])
+        points_layer = pdk.Layer("HeatmapLayer", data=cells.to_dict('records'), get_position='[lon, lat]',
+                                 get_weight='count')
+    else:
+        path = df
+        points_layer = pdk.Layer("ScatterplotLayer", data=df.to_dict('records'), get_position='[lon, lat]',
+                                 get_radius=20, get_fill_color=[0, 0, 255, 160])
+    
+    layers = [
+        pdk.Layer("PathLayer", data=[{'path': path[['lon', 'lat']].to_numpy().tolist()}],
+                  get_path='path', get_color=[0, 0, 255], width_min_pixels=2),
+        points_layer,
+        pdk.Layer("ScatterplotLayer", data=latest.to_dict('records'), get_position='[lon, lat]',
+                  get_radius=40, get_fill_color=[255, 0, 0]),
+    ]
+    view = pdk.ViewState(latitude=float(latest['lat'].iloc[0]),
+                         longitude=float(latest['lon'].iloc[0]), zoom=15)
+    return _SerializedDeck(layers=layers, initial_view_state=view)
+
+class _SerializedDeck(pdk.Deck):
+    """Deck encoded to JSON once when built, so a cached deck isn't re-encoded on every rerun"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._spec = super().to_json()
+    
+    def to_json(self):
+        return self._spec
+
+@st.cache_resource(max_entries=16)
+def _deck(tracking_id, n, latest_ts, _locations):
+    """Build the deck for a long trail, keyed on the newest location like _map_html"""
+    # Layer data is plain records: pydeck only holds weak references to DataFrames
+    return create_deck(_locations)
+
+@st.cache_data(max_entries=64)
+def _map_html(tracking_id, n, latest_ts, _locations):
+    """Render the location map to HTML, keyed on the newest location so reruns reuse it"""
+    return create_map(_locations).get_root().render()
+
 def main():
     # Sidebar
     st.sidebar.title("📍 SafeTrack")
@@ -218,8 +408,8 @@ def main():
             page = "Share Location"
             st.session_state.share_tracking_id = tracking_id_from_url
     
-    # Initialize session state
-    init_session_state()
+    # Load tracking sessions (cached until the next write)
+    st.session_state.tracking_sessions = _load_sessions(st.session_state.sessions_version)
     
     # Add debug information
     debug_database()
@@ -244,7 +434,8 @@ def show_send_request_page():
         
         with col1:
             sender_phone = st.text_input("Your Phone Number (optional)", placeholder="+1234567890")
-            recipient_phone = st.text_input("Recipient's Phone Number*", placeholder="+1234567890")
+            recipient_phone = st.text_input("Recipient's Phone Number*", placeholder="+1234567890",
+                                            help="Separate several numbers with commas to send to each of them")
         
         with col2:
             custom_message = st.text_area(
@@ -256,12 +447,18 @@ def show_send_request_page():
         submitted = st.form_submit_button("Send Tracking Request")
         
         if submitted:
-            if not recipient_phone:
+            recipient_phones = [phone.strip() for phone in recipient_phone.split(',') if phone.strip()]
+            if not recipient_phones:
                 st.error("Please enter recipient's phone number")
                 return
             
             with st.spinner("Sending tracking request..."):
-                result = send_tracking_request(sender_phone, recipient_phone, custom_message)
+                if len(recipient_phones) > 1:
+                    results = send_tracking_requests(sender_phone, recipient_phones, custom_message)
+                    show_bulk_send_results(recipient_phones, results)
+                    return
+                
+                result = send_tracking_request(sender_phone, recipient_phones[0], custom_message)
                 
                 if result['success']:
                     st.success("✅ Tracking request created successfully!")
@@ -271,7 +468,9 @@ def show_send_request_page():
                         st.info(f"**Tracking ID:** {result['tracking_id']}")
                     
                     with col2:
-                        if result.get('sms_sent'):
+                        if result.get('sms_sent') == 'pending':
+                            st.info("📨 SMS queued - check 'View Tracking Sessions' for delivery status")
+                        elif result.get('sms_sent'):
                             st.info("📱 SMS sent to recipient")
                         else:
                             st.warning("⚠️ SMS not sent - Twilio not configured")
@@ -293,6 +492,72 @@ def show_send_request_page():
                 else:
                     st.error(f"Failed to send tracking request: {result.get('error', 'Unknown error')}")
 
+def show_bulk_send_results(recipient_phones, results):
+    """Summarise a multi-recipient send with one line per recipient"""
+    created = sum(1 for result in results if result['success'])
+    if created:
+        st.success(f"✅ {created} tracking requests created successfully!")
+    
+    lines = []
+    for phone, result in zip(recipient_phones, results):
+        if not result['success']:
+            lines.append(f"- **{phone}:** ❌ {result.get('error', 'Unknown error')}")
+        elif result.get('sms_sent') == 'pending':
+            lines.append(f"- **{phone}:** `{result['tracking_id']}` - 📨 SMS queued")
+        elif result.get('sms_sent'):
+            lines.append(f"- **{phone}:** `{result['tracking_id']}` - 📱 SMS sent")
+        else:
+            lines.append(f"- **{phone}:** `{result['tracking_id']}` - ⚠️ SMS not sent, share {result['tracking_url']}")
+    st.markdown("\n".join(lines))
+
+def show_sms_status(tracking_id):
+    """Report the outcome of a background SMS send, if one was queued this session"""
+    future = st.session_state.sms_futures.get(tracking_id)
+    if future is None:
+        return
+    
+    if not future.done():
+        _poll_sms_status(tracking_id)
+        return
+    
+    sms_result = future.result()
+    if sms_result['success']:
+        st.success("📱 SMS sent to recipient")
+    else:
+        st.error(f"SMS Error: {sms_result.get('error', 'Unknown error')}")
+        st.text_input("Share this URL with recipient manually:", sms_result['tracking_url'],
+                      key=f"sms_url_{tracking_id}")
+
+@st.fragment(run_every=2)
+def _poll_sms_status(tracking_id):
+    """Re-check a pending send without rerunning the page, then rerun once it finishes"""
+    if st.session_state.sms_futures[tracking_id].done():
+        st.rerun()
+    st.info("📨 SMS is still being sent...")
+
+def _raw_locations_frame(locations):
+    """Typed frame straight from the location rows, in one call"""
+    return pd.DataFrame.from_records(locations, columns=['latitude', 'longitude', 'accuracy', 'timestamp'])
+
+def _locations_frame(raw):
+    """Format the location history table with vectorized column operations"""
+    return pd.DataFrame({
+        'Timestamp': raw['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'Latitude': raw['latitude'],
+        'Longitude': raw['longitude'],
+        'Accuracy': np.where(raw['accuracy'].fillna(0) != 0, raw['accuracy'].astype(str) + "m", "N/A")
+    })
+
+@st.cache_data(ttl=300, max_entries=32)
+def _csv_bytes(tracking_id, n, _df):
+    """CSV export of a location table; locations are append-only so the count identifies it"""
+    return _df.to_csv(index=False).encode()
+
+@st.cache_data(ttl=300, max_entries=32)
+def _parquet_bytes(tracking_id, n, _raw):
+    """Typed columnar export for analysis, without the table's display formatting"""
+    return _raw.to_parquet(index=False)
+
 def show_tracking_sessions_page():
     st.title("📊 Tracking Sessions")
     
@@ -301,8 +566,7 @@ def show_tracking_sessions_page():
         return
     
     # Session selection
-    session_options = {f"{s.id[:8]}... - {s.recipient_phone} - {s.created_at.strftime('%Y-%m-%d %H:%M')}": s.id 
-                      for s in st.session_state.tracking_sessions}
+    session_options = _session_options(st.session_state.tracking_sessions)
     
     if not session_options:
         st.info("No tracking sessions available.")
@@ -315,8 +579,7 @@ def show_tracking_sessions_page():
     )
     
     tracking_id = session_options[selected_session_label]
-    tracking_session = get_tracking_session(tracking_id)
-    locations = get_locations(tracking_id)
+    tracking_session, locations = get_session_with_locations(tracking_id)
     
     if tracking_session:
         # Session info
@@ -333,36 +596,40 @@ def show_tracking_sessions_page():
             hours_left = max(0, int(expires_in.total_seconds() / 3600))
             st.metric("Hours Left", hours_left)
         
+        show_sms_status(tracking_id)
+        
         # Map and locations
         if locations:
             st.subheader("📍 Location Map")
-            map_obj = create_map(locations)
-            folium_static(map_obj, width=800, height=400)
+            if len(locations) > DECK_MAP_MIN_POINTS:
+                st.pydeck_chart(_deck(tracking_id, len(locations), locations[-1].timestamp, locations),
+                                height=400)
+            else:
+                map_html = _map_html(tracking_id, len(locations), locations[-1].timestamp, locations)
+                components.html(map_html, width=800, height=400)
             
             # Location history
             st.subheader("📋 Location History")
-            locations_data = []
-            for loc in locations:
-                locations_data.append({
-                    'Timestamp': loc.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                    'Latitude': loc.latitude,
-                    'Longitude': loc.longitude,
-                    'Accuracy': f"{loc.accuracy}m" if loc.accuracy else "N/A"
-                })
-            
-            df = pd.DataFrame(locations_data)
+            raw = _raw_locations_frame(locations)
+            df = _locations_frame(raw)
             st.dataframe(df, use_container_width=True)
             
             # Export options
             col1, col2 = st.columns(2)
             with col1:
-                csv = df.to_csv(index=False)
                 st.download_button(
                     label="Download CSV",
-                    data=csv,
+                    data=_csv_bytes(tracking_id, len(locations), df),
                     file_name=f"locations_{tracking_id[:8]}.csv",
                     mime="text/csv"
                 )
+            with col2:
+                st.download_button(
+                    label="Download Parquet",
+                    data=_parquet_bytes(tracking_id, len(locations), raw),
+                    file_name=f"locations_{tracking_id[:8]}.parquet",
+                    mime="application/vnd.apache.parquet"
+                )
             
         else:
             st.info("No locations received yet. Waiting for recipient to share their location.")
@@ -394,8 +661,8 @@ def show_share_location_page():
         tracking_id = st.text_input("Enter Tracking ID", placeholder="Paste the tracking ID from your SMS")
     
     if tracking_id:
-        # Verify tracking session exists
-        tracking_session = get_tracking_session(tracking_id)
+        # Verify tracking session exists (cached metadata), then load its locations
+        tracking_session, locations = get_session_with_locations(tracking_id)
         if not tracking_session:
             st.error("❌ Invalid tracking ID. Please check and try again.")
             st.info("Make sure you're using the correct Tracking ID from the SMS or URL.")
@@ -403,12 +670,13 @@ def show_share_location_page():
         
         # Check if expired
         if tracking_session.expires_at and tracking_session.expires_at < datetime.now(timezone.utc):
-            tracking_session.status = 'expired'
-            session = db.get_session()
-            try:
-                session.commit()
-            finally:
-                session.close()
+            with db.session_scope() as session:
+                session.execute(
+                    update(TrackingSession)
+                    .where(TrackingSession.id == tracking_id)
+                    .values(status='expired')
+                )
+            _load_session_meta.clear()
             st.error("❌ This tracking link has expired.")
             return
         
@@ -419,19 +687,36 @@ def show_share_location_page():
         
         st.markdown("---")
         
-        # Use the improved share_location function
-        share_location_manual(tracking_id)
+        # A full run has just loaded fresh locations, so drop any kept from fragment reruns
+        st.session_state.share_locations.pop(tracking_id, None)
+        _share_location_fragment(tracking_id, locations)
+
+@st.fragment
+def _share_location_fragment(tracking_id, locations):
+    """Location form and history; using the form reruns only this block, not the page"""
+    # Use the improved share_location function
+    if share_location_manual(tracking_id):
+        st.session_state.share_locations[tracking_id] = get_locations(tracking_id)
+    
+    # Show previous locations if any; `locations` is from the last full run, so prefer
+    # the list re-queried after a save in this fragment
+    existing_locations = st.session_state.share_locations.get(tracking_id, locations)
+    if existing_locations:
+        st.subheader("Your Previously Shared Locations")
+        map_html = _map_html(tracking_id, len(existing_locations),
+                             existing_locations[-1].timestamp, existing_locations)
+        components.html(map_html, width=700, height=300)
         
-        # Show previous locations if any
-        existing_locations = get_locations(tracking_id)
-        if existing_locations:
-            st.subheader("Your Previously Shared Locations")
-            map_obj = create_map(existing_locations)
-            folium_static(map_obj, width=700, height=300)
-            
-            for i, loc in enumerate(reversed(existing_locations[-3:]), 1):
-                st.write(f"**Location {i}:** {loc.timestamp.strftime('%H:%M:%S')} - "
-                        f"Lat: {loc.latitude:.6f}, Lng: {loc.longitude:.6f}")
+        st.markdown("\n\n".join(
+            f"**Location {i}:** {loc.timestamp.strftime('%H:%M:%S')} - "
+            f"Lat: {loc.latitude:.6f}, Lng: {loc.longitude:.6f}"
+            for i, loc in enumerate(reversed(existing_locations[-3:]), 1)
+        ))
+
+def _set_quick_location(lat, lng):
+    """Button callback; runs before the rerun, so the inputs already show the new coordinates"""
+    st.session_state.latitude_input = lat
+    st.session_state.longitude_input = lng
 
 def share_location_manual(tracking_id):
     """Improved manual location sharing with better UI"""
@@ -450,14 +735,12 @@ def share_location_manual(tracking_id):
         latitude = st.number_input("Latitude", 
                                  min_value=-90.0, 
                                  max_value=90.0, 
-                                 value=st.session_state.lat,
                                  format="%.6f",
                                  key="latitude_input")
     with col2:
         longitude = st.number_input("Longitude", 
                                   min_value=-180.0, 
                                   max_value=180.0, 
-                                  value=st.session_state.lng,
                                   format="%.6f",
                                   key="longitude_input")
     
@@ -469,28 +752,20 @@ def share_location_manual(tracking_id):
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        if st.button("📍 Delhi", use_container_width=True):
-            st.session_state.lat = 28.6139
-            st.session_state.lng = 77.2090
-            st.rerun()
+        st.button("📍 Delhi", use_container_width=True,
+                  on_click=_set_quick_location, args=(28.6139, 77.2090))
     
     with col2:
-        if st.button("📍 Mumbai", use_container_width=True):
-            st.session_state.lat = 19.0760
-            st.session_state.lng = 72.8777
-            st.rerun()
+        st.button("📍 Mumbai", use_container_width=True,
+                  on_click=_set_quick_location, args=(19.0760, 72.8777))
     
     with col3:
-        if st.button("📍 Bangalore", use_container_width=True):
-            st.session_state.lat = 12.9716
-            st.session_state.lng = 77.5946
-            st.rerun()
+        st.button("📍 Bangalore", use_container_width=True,
+                  on_click=_set_quick_location, args=(12.9716, 77.5946))
     
     with col4:
-        if st.button("📍 Chennai", use_container_width=True):
-            st.session_state.lat = 13.0827
-            st.session_state.lng = 80.2707
-            st.rerun()
+        st.button("📍 Chennai", use_container_width=True,
+                  on_click=_set_quick_location, args=(13.0827, 80.2707))
     
     # Share location button
     if st.button("📍 Share My Location", type="primary", use_container_width=True):
@@ -529,9 +804,11 @@ def share_location_manual(tracking_id):
                 
                 # Show success message
                 st.info("✅ Your location has been shared with the person who requested it!")
+                return True
                 
             else:
                 st.error(f"❌ Failed to share location: {result.get('error', 'Unknown error')}")
+    return False
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,10 @@
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Float, Integer, ForeignKey
+from sqlalchemy import create_engine, event, text, Column, String, Text, DateTime, Float, Integer, ForeignKey, Index, BINARY
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
+from sqlalchemy.pool import QueuePool
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
 import uuid
 import os
@@ -8,10 +12,25 @@ import streamlit as st
 
 Base = declarative_base()
 
+class UUIDBin(TypeDecorator):
+    """UUID kept as a string in Python and as 16 raw bytes in the database"""
+    impl = BINARY(16)
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return None if value is None else uuid.UUID(value).bytes
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else str(uuid.UUID(bytes=value))
+
 class TrackingSession(Base):
     __tablename__ = 'tracking_sessions'
+    __table_args__ = (
+        # Serves the newest-first session list without sorting the whole table
+        Index('ix_ts_created', 'created_at'),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDBin(), primary_key=True, default=lambda: str(uuid.uuid4()))
     sender_phone = Column(String(20), nullable=True)
     recipient_phone = Column(String(20), nullable=False)
     message = Column(Text, nullable=True)
@@ -23,9 +42,13 @@ class TrackingSession(Base):
 
 class LocationUpdate(Base):
     __tablename__ = 'location_updates'
+    __table_args__ = (
+        # Serves get_locations' WHERE session_id = ? ORDER BY timestamp without a sort
+        Index('ix_loc_session_ts', 'session_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(String(36), ForeignKey('tracking_sessions.id'), nullable=False)
+    session_id = Column(UUIDBin(), ForeignKey('tracking_sessions.id'), nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     accuracy = Column(Float, nullable=True)
@@ -34,6 +57,31 @@ class LocationUpdate(Base):
     
     session = relationship("TrackingSession", back_populates="locations")
 
+@dataclass(frozen=True)
+class SessionSummary:
+    """Detached snapshot of a tracking session for listing in the UI"""
+    id: str
+    recipient_phone: str
+    created_at: datetime
+    status: str
+
+@dataclass(frozen=True)
+class SessionMeta:
+    """Detached snapshot of the session fields the pages validate and display"""
+    id: str
+    recipient_phone: str
+    message: str
+    status: str
+    expires_at: datetime
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets page reads proceed while recipients are writing location updates"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
 class Database:
     def __init__(self):
         # For Streamlit Cloud, use /tmp directory which is writable
@@ -42,18 +90,62 @@ class Database:
         else:
             self.database_url = "sqlite:///safetrack.db"
             
-        self.engine = create_engine(self.database_url)
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # Keep connections open across Streamlit reruns instead of reconnecting per query
+        self.engine = create_engine(
+            self.database_url,
+            poolclass=QueuePool,
+            pool_size=5,
+            max_overflow=10,
+            connect_args={"check_same_thread": False}
+        )
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", _set_sqlite_pragmas)
+        
+        self.Session = scoped_session(sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            expire_on_commit=False,
+            bind=self.engine
+        ))
         
     def init_db(self):
         try:
             Base.metadata.create_all(bind=self.engine)
+            # create_all skips existing tables, so add indexes introduced since they were created
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=self.engine, checkfirst=True)
+            if self.engine.dialect.name == "sqlite":
+                self._migrate_text_ids()
             # Don't show success message here to avoid clutter
         except Exception as e:
             st.error(f"Database initialization error: {e}")
+    
+    def _migrate_text_ids(self):
+        """Rewrite session ids stored as 36-character text by older versions into 16-byte form"""
+        with self.engine.begin() as conn:
+            old_ids = conn.execute(
+                text("SELECT id FROM tracking_sessions WHERE typeof(id) = 'text'")
+            ).scalars().all()
+            if not old_ids:
+                return
+            
+            params = [{'old': old, 'new': uuid.UUID(old).bytes} for old in old_ids]
+            conn.execute(text("UPDATE location_updates SET session_id = :new WHERE session_id = :old"), params)
+            conn.execute(text("UPDATE tracking_sessions SET id = :new WHERE id = :old"), params)
 
-    def get_session(self):
-        return self.SessionLocal()
+    @contextmanager
+    def session_scope(self):
+        """Transactional scope around this thread's session, released back to the pool on exit"""
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self.Session.remove()
 
 # Initialize database quietly
 db = Database()
@@ -0,0 +1,81 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; without it the kernels run as plain NumPy
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+EARTH_RADIUS_M = 6371000.0
+
+@njit(cache=True)
+def rdp_mask(x, y, eps):
+    """Ramer-Douglas-Peucker simplification, returns a mask of the points to keep"""
+    n = len(x)
+    keep = np.zeros(n, dtype=np.bool_)
+    if n == 0:
+        return keep
+    keep[0] = True
+    keep[n - 1] = True
+
+    # Iterative instead of recursive so long trails can't hit the recursion limit
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # Distance of every interior point to the start-end segment, in one pass
+        dx = x[end] - x[start]
+        dy = y[end] - y[start]
+        px = x[start + 1:end] - x[start]
+        py = y[start + 1:end] - y[start]
+        seg_len = np.hypot(dx, dy)
+        if seg_len == 0:
+            dists = np.hypot(px, py)
+        else:
+            dists = np.abs(dx * py - dy * px) / seg_len
+
+        i = np.argmax(dists)
+        if dists[i] > eps:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+def haversine(lat, lng, lats, lngs):
+    """Great-circle distance in metres from one point to each of many"""
+    lat, lng = np.radians(lat), np.radians(lng)
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def simplify(lats, lngs, eps_meters=25.0):
+    """Indices of the points that survive simplifying a lat/lng trail to `eps_meters`"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if len(lats) < 3:
+        return np.arange(len(lats))
+
+    # Equirectangular projection to metres; accurate enough at tracking-trail scale
+    lat0 = np.radians(lats.mean())
+    x = np.radians(lngs) * np.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(lats) * EARTH_RADIUS_M
+    # Always a float, so calls reuse the specialisation compiled at import
+    return np.flatnonzero(rdp_mask(x, y, float(eps_meters)))
+
+def grid_counts(lats, lngs, cell_meters=100.0):
+    """Bucket points into square cells about `cell_meters` across; returns cell centres and counts"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    cell_lat = np.degrees(cell_meters / EARTH_RADIUS_M)
+    cell_lng = cell_lat / np.cos(np.radians(lats.mean()))
+    
+    cells = np.stack([np.floor(lats / cell_lat), np.floor(lngs / cell_lng)], axis=1)
+    cells, counts = np.unique(cells, axis=0, return_counts=True)
+    return (cells[:, 0] + 0.5) * cell_lat, (cells[:, 1] + 0.5) * cell_lng, counts
+
+# Compile once at import rather than on the first map render
+rdp_mask(np.zeros(3), np.zeros(3), 1.0)
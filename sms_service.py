@@ -1,10 +1,17 @@
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+from requests.adapters import HTTPAdapter
 import os
+from functools import cached_property
 from dotenv import load_dotenv
 import streamlit as st
 
 load_dotenv()
 
+# Shared keep-alive HTTP session so repeated sends reuse the TLS connection to Twilio
+http_client = TwilioHttpClient(pool_connections=True, timeout=5)
+http_client.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
 class SMSService:
     def __init__(self):
         self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
@@ -16,18 +23,24 @@ class SMSService:
         self.twilio_configured = all([self.account_sid, self.auth_token, self.phone_number])
         
         if self.twilio_configured:
-            try:
-                self.client = Client(self.account_sid, self.auth_token)
-                # Test credentials by making a simple API call
-                self.client.api.accounts(self.account_sid).fetch()
-            except Exception as e:
-                st.error(f"Twilio configuration error: {e}")
-                self.twilio_configured = False
-                self.client = None
+            # Verifying credentials costs a Twilio round trip, so it's opt-in
+            if os.getenv('TWILIO_VERIFY_ON_START'):
+                try:
+                    self.client.api.accounts(self.account_sid).fetch()
+                except Exception as e:
+                    st.error(f"Twilio configuration error: {e}")
+                    self.twilio_configured = False
+                    self.client = None
         else:
-            self.client = None
             st.warning("⚠️ Twilio not configured - SMS features disabled")
     
+    @cached_property
+    def client(self):
+        """Twilio client, built on first use and reused for every send"""
+        if not self.twilio_configured:
+            return None
+        return Client(self.account_sid, self.auth_token, http_client=http_client)
+    
     def send_tracking_request(self, recipient_phone, tracking_id, custom_message=None):
         tracking_url = f"{self.server_url}/?tracking_id={tracking_id}"
         
@@ -73,5 +86,10 @@ class SMSService:
                 'message': f'SMS failed: {str(e)}'
             }
 
-sms_service = SMSService()
+@st.cache_resource
+def get_sms_service():
+    """One SMSService per process, kept across Streamlit reruns"""
+    return SMSService()
+
+sms_service = get_sms_service()
 